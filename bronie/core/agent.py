@@ -1,23 +1,43 @@
 import json
+import orjson
 import sys
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.pretty import Pretty
 from rich.panel import Panel
 from rich.text import Text
-from ..llm import complete_chat, complete_chat_stream, get_agent_model, get_light_model
+from ..llm import RetryBudgetExceeded, complete_chat, complete_chat_stream, get_agent_model, get_light_model
 from ..tools.registry import dispatch_tool
 from .input_handler import get_user_input
 from .interrupts import handle_keyboard_interrupt
 
 console = Console()
 
+# Markdown markers nearly always show up near the top of a tool result, so only
+# the first few KB are probed before paying for the Markdown renderer.
+_MD_RE = re.compile(r'[#*_`]')
+_MD_PROBE_CHARS = 4096
+
+def print_markdown(text):
+    # rich.markdown pulls in a full Markdown parser, so import it on first use.
+    from rich.markdown import Markdown
+    console.print(Markdown(text))
+
 # ------------------------------------------------------------
 # Helper
 # ------------------------------------------------------------
 
+def dump_tool_result(tool_result):
+    """Serialise a tool result for the conversation."""
+    try:
+        return orjson.dumps(tool_result).decode()
+    except orjson.JSONEncodeError:
+        # orjson rejects what json.dumps escapes, e.g. the surrogate-escaped
+        # names os.scandir gives non-UTF-8 filenames
+        return json.dumps(tool_result)
+
 # A tolerant JSON parser for model responses that may contain
 # markdown fences, extra logging text, or minor formatting issues.
 def robust_json_parse(text: str):
@@ -32,8 +52,8 @@ def robust_json_parse(text: str):
     stripped = text.strip()
 
     try:
-        return json.loads(stripped)
-    except json.JSONDecodeError:
+        return orjson.loads(stripped)
+    except orjson.JSONDecodeError:
         pass
 
     # find the first { and the last }
@@ -42,8 +62,8 @@ def robust_json_parse(text: str):
     if start != -1 and end != -1 and end > start:
         candidate = stripped[start : end + 1]
         try:
-            return json.loads(candidate)
-        except json.JSONDecodeError:
+            return orjson.loads(candidate)
+        except orjson.JSONDecodeError:
             pass
 
     FIX_PROMPT = """You need to fix this JSON object. Please fix it such that it cleanly decodes. Output only the fixed JSON object, no other text."""
@@ -52,11 +72,117 @@ def robust_json_parse(text: str):
         {"role": "user", "content": stripped}
     ], model=get_light_model(), response_format={"type": "json_object"})
     print('Fixing model JSON...')
-    return json.loads(json_fixed)
+    return orjson.loads(json_fixed)
+
+# Read-only tools don't touch the filesystem or the user, so several of them in
+# one response can run concurrently.
+PARALLEL_SAFE_TOOLS = frozenset({"read_file", "list_files", "grep_search", "search_files"})
+_tool_executor = ThreadPoolExecutor(max_workers=8)
+
+def _is_parallel_safe(tool_call):
+    return (isinstance(tool_call, dict)
+            and tool_call.get("name") in PARALLEL_SAFE_TOOLS
+            and isinstance(tool_call.get("parameters"), dict))
+
+def _submit_tool_call(tool_call):
+    return _tool_executor.submit(dispatch_tool, tool_call["name"], **tool_call["parameters"])
+
+class ToolCallPrefetcher:
+    """Start read-only tool calls while the model is still streaming.
+
+    Streamed text is fed through a small brace-depth scanner. Every time an
+    object directly inside the top-level ``tool_calls`` array closes, it is
+    parsed and, if it extends the leading run of read-only calls, dispatched
+    immediately so the tool runs while the rest of the response is generated.
+    """
+
+    def __init__(self):
+        self.started = []  # (tool_call, future) pairs, in stream order
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._key = None  # Characters of the string being read at the top level
+        self._last_key = None  # Last complete top-level string, i.e. the key of an array that opens next
+        self._in_tool_calls = False
+        self._current = None
+        self._stopped = False
+
+    def feed(self, chunk):
+        for ch in chunk:
+            if self._current is not None:
+                self._current.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key is not None:
+                        self._last_key = "".join(self._key)
+                        self._key = None
+                    continue
+                if self._key is not None:
+                    self._key.append(ch)
+            elif ch == '"':
+                self._in_string = True
+                if self._stack == ["{"]:
+                    self._key = []
+            elif ch == "{" or ch == "[":
+                if ch == "[" and self._stack == ["{"]:
+                    # Other top-level arrays (a "plan", say) can hold objects too
+                    self._in_tool_calls = self._last_key == "tool_calls"
+                elif ch == "{" and self._stack == ["{", "["] and self._in_tool_calls:
+                    self._current = [ch]
+                self._stack.append(ch)
+            elif ch == "}" or ch == "]":
+                if self._stack:
+                    self._stack.pop()
+                if ch == "}" and self._current is not None and self._stack == ["{", "["]:
+                    self._on_tool_call("".join(self._current))
+                    self._current = None
+
+    def _on_tool_call(self, text):
+        if self._stopped:
+            return
+        try:
+            tool_call = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            tool_call = None
+        if not _is_parallel_safe(tool_call):
+            self._stopped = True
+            return
+        self.started.append((tool_call, _submit_tool_call(tool_call)))
+
+def prefetch_tool_calls(tool_calls, started=()):
+    """Start the leading run of read-only tool calls concurrently.
+
+    Returns a dict mapping each started call's index to its Future. Calls after
+    the first non-read-only tool are left for the sequential loop so they see
+    its side effects. Futures already *started* while streaming are reused when
+    they match the parsed call at the same index; otherwise nothing new is
+    started unless at least two calls qualify.
+    """
+    run = []
+    for tool_call in tool_calls:
+        if not _is_parallel_safe(tool_call):
+            break
+        run.append(tool_call)
+
+    futures = {}
+    for i, tool_call in enumerate(run):
+        if i < len(started) and started[i][0] == tool_call:
+            futures[i] = started[i][1]
+    if len(run) >= 2:
+        for i, tool_call in enumerate(run):
+            if i not in futures:
+                futures[i] = _submit_tool_call(tool_call)
+    return futures
 
 class Agent:
-    def __init__(self, project_dir=None, get_agent_system_prompt=None):
+    def __init__(self, project_dir=None, get_agent_system_prompt=None, exact_tokens=False):
         self.project_dir = project_dir
+        self.exact_tokens = exact_tokens
         self.get_agent_system_prompt = get_agent_system_prompt
         self.multiline_mode = [False]
         self.attached_images = []
@@ -72,7 +198,8 @@ class Agent:
                     self.attached_images, 
                     self.get_agent_system_prompt, 
                     self.messages,
-                    self.project_dir
+                    self.project_dir,
+                    self.exact_tokens
                 )
                 
                 if mode_switched:
@@ -108,18 +235,21 @@ class Agent:
                 agent_model = get_agent_model()
                 
                 while True:
+                    prefetcher = ToolCallPrefetcher()
                     # Try streaming first for better user experience, fall back to regular completion if needed
                     try:
-                        response = ""
+                        response_parts = []
                         for chunk in complete_chat_stream(messages=self.messages, response_format={
                             "type": "json_object"
                         }, model=agent_model):
                             if chunk:
                                 sys.stdout.write(chunk)
                                 sys.stdout.flush()
-                                response += chunk
+                                response_parts.append(chunk)
+                                prefetcher.feed(chunk)
                                 # Note: Ctrl+D detection removed as it's not compatible with Windows
                                 # Users can use Ctrl+C to interrupt instead
+                        response = "".join(response_parts)
                         print()  # New line after streaming completes
                     except KeyboardInterrupt:
                         handle_keyboard_interrupt(console)
@@ -131,17 +261,21 @@ class Agent:
                         # Handle API key errors gracefully
                         console.print(Text(f"❌ Error: {e}", style="red"))
                         break
+                    except RetryBudgetExceeded as e:
+                        # Falling back would start a second retry budget
+                        console.print(Text(f"❌ Error: {e}", style="red"))
+                        break
                     except Exception as e:
                         console.print(f"[yellow]Streaming failed, falling back to regular completion: {e}[/]")
                         try:
                             response = complete_chat(messages=self.messages, response_format={
                                 "type": "json_object"
                             }, model=agent_model)
-                            console.print(Markdown(response))
+                            print_markdown(response)
                         except KeyboardInterrupt:
                             handle_keyboard_interrupt(console)
                             break  # Return control to input prompt after second Ctrl+C
-                        except ValueError as e:
+                        except (ValueError, RetryBudgetExceeded) as e:
                             # Also handle API key errors in the fallback
                             console.print(Text(f"❌ Error: {e}", style="red"))
                             break
@@ -158,10 +292,13 @@ class Agent:
                     self.messages.append({"role": "assistant", "content": [{"type": "text", "text": response}]})
 
                     if "tool_calls" in response_json:
-                        for tool_call in response_json["tool_calls"]:
+                        prefetched = prefetch_tool_calls(response_json["tool_calls"], prefetcher.started)
+                        for index, tool_call in enumerate(response_json["tool_calls"]):
                             try:
+                                if index in prefetched:
+                                    tool_result = prefetched[index].result()
                                 # Handle special case for edit_file with images
-                                if tool_call["name"] == "edit_file" and current_images:
+                                elif tool_call["name"] == "edit_file" and current_images:
                                     tool_result = dispatch_tool(
                                         tool_call["name"], 
                                         target_file=tool_call["parameters"]["target_file"],
@@ -173,7 +310,7 @@ class Agent:
                                     tool_result = dispatch_tool(tool_call["name"], **tool_call["parameters"])
                                 
                                 # Record the tool result in the conversation so the model can see it
-                                self.messages.append({"role": "user", "content": [{"type": "text", "text": json.dumps(tool_result)}]})
+                                self.messages.append({"role": "user", "content": [{"type": "text", "text": dump_tool_result(tool_result)}]})
 
                                 # If tool_result signals an error, explicitly add a readable message for the model
                                 if isinstance(tool_result, dict) and "error" in tool_result:
@@ -184,7 +321,7 @@ class Agent:
                                 if tool_call["name"] == "talk_to_user":
                                     if isinstance(tool_result, dict) and "type" in tool_result and "content" in tool_result:
                                         if tool_result["type"] == "markdown":
-                                            console.print(Markdown(tool_result["content"]))
+                                            print_markdown(tool_result["content"])
                                         elif tool_result["type"] == "panel":
                                             console.print(Panel(tool_result["content"]))
                                     terminate = True
@@ -192,7 +329,10 @@ class Agent:
                                 elif isinstance(tool_result, dict) and "formatted_output" in tool_result:
                                     console.print(Panel(tool_result["formatted_output"], title="Shell Output", highlight=True))
                                 elif isinstance(tool_result, str):
-                                    console.print(Markdown(tool_result))
+                                    if _MD_RE.search(tool_result, 0, _MD_PROBE_CHARS):
+                                        print_markdown(tool_result)
+                                    else:
+                                        console.print(Text(tool_result))
                                 else:
                                     console.print(Pretty(tool_result))
                             except KeyboardInterrupt:
@@ -9,7 +9,7 @@ from rich.panel import Panel
 from rich.text import Text
 from ..ui.commands import handle_ui_command
 from .interrupts import handle_keyboard_interrupt
-import tiktoken
+from ..llm import count_tokens_messages, estimate_tokens_messages
 from .. import token_tracker
 
 console = Console()
@@ -36,20 +36,22 @@ def get_input_instructions_panel(mode_text, project_dir):
         border_style="green"
     )
 
-# Cache encoder once for efficiency
-ENCODER = tiktoken.encoding_for_model("gpt-4")
-
-def get_user_input(multiline_mode, attached_images, get_agent_system_prompt, messages, project_dir=None):
+def get_user_input(multiline_mode, attached_images, get_agent_system_prompt, messages, project_dir=None, exact_tokens=False):
     """Enhanced user input processing with prompt_toolkit multiline support"""
     
-    token_count = count_tokens(messages)
+    # The context counter is informational only, so estimate it unless the
+    # user asked for exact (tokenizer-backed) counts.
+    if exact_tokens:
+        token_count = f"{count_tokens(messages):,}"
+    else:
+        token_count = f"~{estimate_tokens_messages(messages):,}"
     
     # Aggregate session token usage (input/output)
     in_tokens, out_tokens = token_tracker.get_totals()
     total_tokens = in_tokens + out_tokens
 
     console.print(
-        f"[cyan]Context tokens:[/] {token_count:,} "
+        f"[cyan]Context tokens:[/] {token_count} "
         f"[dim]| Session in/out:[/] {in_tokens:,}/{out_tokens:,} "
         f"(total {total_tokens:,})"
     )
@@ -154,12 +156,4 @@ def get_user_input(multiline_mode, attached_images, get_agent_system_prompt, mes
 
 def count_tokens(messages):
     """Count tokens in messages - moved from main.py"""
-    num_tokens = 0
-    for message in messages:
-        if isinstance(message["content"], str):
-            num_tokens += len(ENCODER.encode(message["content"]))
-        elif isinstance(message["content"], list):
-            for content in message["content"]:
-                if isinstance(content, dict) and "text" in content:
-                    num_tokens += len(ENCODER.encode(content["text"]))
-    return num_tokens 
+    return count_tokens_messages(messages)
@@ -1,9 +1,11 @@
+import logging
 import os
+import random
 import time
-import requests
-from typing import Iterator, List, Optional, Dict, Tuple
-from openai import OpenAI
-import tiktoken
+import httpx
+import orjson
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterator, List, Optional, Dict, Tuple
 
 from .tools.config import (
     get_agent_model as config_get_agent_model, 
@@ -12,22 +14,80 @@ from .tools.config import (
     get_providers
 )
 
-# Add helper function to count tokens
-ENCODER = tiktoken.encoding_for_model("gpt-4")
+if TYPE_CHECKING:
+    from openai import OpenAI
 
-def _count_tokens_text(text: str) -> int:
-    return len(ENCODER.encode(text))
+logger = logging.getLogger(__name__)
+
+# Loading the BPE tables is slow, so defer it until something is actually counted.
+@lru_cache(maxsize=1)
+def _encoder():
+    import tiktoken
+    return tiktoken.encoding_for_model("gpt-4")
 
-def _count_tokens_messages(messages) -> int:
-    total = 0
+# Message texts are counted again on every turn, so cache counts per text. The
+# key is the string itself; str caches its own hash, so lookups for the same
+# message object are O(1) and only newly added messages are actually encoded.
+_TOKEN_CACHE_SIZE = 4096
+_token_counts: Dict[str, int] = {}
+
+def _iter_message_texts(messages) -> Iterator[str]:
+    """Yield every text part of *messages*, for both plain and multi-part content."""
     for m in messages:
-        if isinstance(m.get("content"), str):
-            total += _count_tokens_text(m["content"])
-        elif isinstance(m.get("content"), list):
-            for c in m["content"]:
+        content = m.get("content")
+        if isinstance(content, str):
+            yield content
+        elif isinstance(content, list):
+            for c in content:
                 if isinstance(c, dict) and "text" in c:
-                    total += _count_tokens_text(c["text"])
-    return total
+                    yield c["text"]
+
+def _count_tokens_texts(texts: List[str]) -> int:
+    missing = [t for t in dict.fromkeys(texts) if t not in _token_counts]
+    if missing:
+        if len(_token_counts) + len(missing) > _TOKEN_CACHE_SIZE:
+            _token_counts.clear()
+            missing = list(dict.fromkeys(texts))
+        # One native call for all uncached texts instead of one per message.
+        encoded = _encoder().encode_batch(missing, num_threads=4)
+        for text, tokens in zip(missing, encoded):
+            _token_counts[text] = len(tokens)
+    return sum(_token_counts[t] for t in texts)
+
+def _count_tokens_text(text: str) -> int:
+    return _count_tokens_texts([text])
+
+def count_tokens_messages(messages) -> int:
+    """Count the tokens in the text of *messages*."""
+    return _count_tokens_texts(list(_iter_message_texts(messages)))
+
+def estimate_tokens_messages(messages) -> int:
+    """Cheap ~4 characters per token estimate, for display where exactness doesn't matter."""
+    return sum(len(t) for t in _iter_message_texts(messages)) // 4
+
+# Rate-limit retries use full-jitter exponential backoff, capped per attempt and
+# bounded by a total wall-clock budget so a 429 storm can't block forever.
+MAX_BACKOFF = 60
+RETRY_BUDGET = 60*5
+
+class RetryBudgetExceeded(Exception):
+    """Raised when rate-limit retries would run past ``RETRY_BUDGET``."""
+
+def _sleep_backoff(attempt: int, deadline: float) -> None:
+    """Sleep for a jittered backoff delay, or raise if it would pass *deadline*."""
+    delay = random.random() * min(MAX_BACKOFF, 2 ** attempt)
+    if time.monotonic() + delay > deadline:
+        raise RetryBudgetExceeded(f"Rate limit retries exceeded {RETRY_BUDGET} second budget")
+    print(f"Rate limit exceeded. Retrying in {delay:.1f} seconds...", flush=True)
+    time.sleep(delay)
+
+# One pooled HTTP/2 transport shared by every provider client and the model
+# listing, so back-to-back completions reuse connections instead of handshaking.
+_http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=32, max_keepalive_connections=32),
+    timeout=60*10,
+)
 
 class LLMManager:
     def __init__(self):
@@ -45,14 +105,14 @@ class LLMManager:
             return []
         
         try:
-            response = requests.get(
+            response = _http_client.get(
                 "https://openrouter.ai/api/v1/models",
                 headers={"Authorization": f"Bearer {api_key}"}
             )
             response.raise_for_status()
             self._openrouter_models_cache = response.json().get('data', [])
             return self._openrouter_models_cache
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             print(f"Could not fetch OpenRouter models: {e}")
             return []
 
@@ -86,8 +146,10 @@ class LLMManager:
                 return provider
         return None
 
-    def get_client_for_model(self, model_id: str) -> Tuple[OpenAI, str]:
+    def get_client_for_model(self, model_id: str) -> Tuple["OpenAI", str]:
         """Get an OpenAI client and the model name for a given model ID."""
+        # The SDK is slow to import, so defer it until a client is needed.
+        from openai import OpenAI
         provider = self._get_provider_for_model(model_id)
         if not provider:
             raise ValueError(f"No provider found for model {model_id}")
@@ -105,6 +167,7 @@ class LLMManager:
         client = OpenAI(
             api_key=api_key,
             base_url=provider.get("api_base"),
+            http_client=_http_client,
         )
         _, model_name = model_id.split('/', 1)
         return client, model_name
@@ -148,41 +211,42 @@ def complete_chat_stream(model: Optional[str] = None, **kwargs) -> Iterator[str]
 
     tries = 0
     max_tries = 3
-    backoff_time = 2
+    rate_limit_attempts = 0
+    deadline = time.monotonic() + RETRY_BUDGET
 
     if 'timeout' not in kwargs:
         kwargs['timeout'] = 60*10
     
     kwargs['stream'] = True
 
-    input_tokens_msg = _count_tokens_messages(kwargs.get("messages", []))
+    input_tokens_msg = count_tokens_messages(kwargs.get("messages", []))
 
     while tries < max_tries:
         response = None
         try:
             response = client.chat.completions.create(**kwargs)
             
-            response_text = ""
-            try:
-                for chunk in response:
-                    if chunk.choices[0].delta.content is not None:
-                        part = chunk.choices[0].delta.content
-                        yield part
-                        response_text += part
-            except KeyboardInterrupt:
-                return
-
-            output_tokens_calc = _count_tokens_text(response_text)
+            response_parts = []
+            # A Ctrl+C here propagates, so callers can tell a cancelled stream
+            # from a finished one rather than getting the truncated text
+            for chunk in response:
+                if chunk.choices[0].delta.content is not None:
+                    part = chunk.choices[0].delta.content
+                    yield part
+                    response_parts.append(part)
+
+            output_tokens_calc = _count_tokens_text("".join(response_parts))
             from .token_tracker import track_tokens
             track_tokens(input_tokens_msg, output_tokens_calc)
             
             return
             
+        except RetryBudgetExceeded:
+            raise
         except Exception as e:
-            print('EXCEPTION: ', flush=True)
-            print(e, flush=True)
-            if response:
-                print(response, flush=True)
+            logger.error("LLM call failed: %s", e)
+            if response and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Failed response: %r", response)
             
             if "401" in str(e):
                 raise ValueError(f"Invalid or missing API key for model {model_id}") from e
@@ -192,9 +256,8 @@ def complete_chat_stream(model: Optional[str] = None, **kwargs) -> Iterator[str]
                 error_code = e.error['code']
             
             if error_code == 429:
-                print(f"Rate limit exceeded. Retrying in {backoff_time} seconds...", flush=True)
-                time.sleep(backoff_time)
-                backoff_time *= 2
+                rate_limit_attempts += 1
+                _sleep_backoff(rate_limit_attempts, deadline)
                 continue
             
             tries += 1
@@ -214,7 +277,8 @@ def complete_chat(model: Optional[str] = None, **kwargs) -> str:
 
     tries = 0
     max_tries = 3
-    backoff_time = 2
+    rate_limit_attempts = 0
+    deadline = time.monotonic() + RETRY_BUDGET
 
     if 'timeout' not in kwargs:
         kwargs['timeout'] = 60*10
@@ -225,24 +289,24 @@ def complete_chat(model: Optional[str] = None, **kwargs) -> str:
             response = client.chat.completions.create(**kwargs)
             
             if hasattr(response, 'error') and isinstance(response.error, dict) and response.error.get('code') == 429:
-                print(f"Rate limit exceeded in response. Retrying in {backoff_time} seconds...", flush=True)
-                time.sleep(backoff_time)
-                backoff_time *= 2
+                rate_limit_attempts += 1
+                _sleep_backoff(rate_limit_attempts, deadline)
                 continue
             
             text_response = response.choices[0].message.content
             
-            input_tokens_msg = _count_tokens_messages(kwargs.get("messages", []))
+            input_tokens_msg = count_tokens_messages(kwargs.get("messages", []))
             output_tokens_calc = _count_tokens_text(text_response)
             from .token_tracker import track_tokens
             track_tokens(input_tokens_msg, output_tokens_calc)
             
             return text_response
+        except RetryBudgetExceeded:
+            raise
         except Exception as e:
-            print('EXCEPTION: ', flush=True)
-            print(e, flush=True)
-            if response:
-                print(response, flush=True)
+            logger.error("LLM call failed: %s", e)
+            if response and logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Failed response: %r", response)
             
             error_message = str(e)
             if "401" in error_message:
@@ -253,9 +317,8 @@ def complete_chat(model: Optional[str] = None, **kwargs) -> str:
                 error_code = e.error['code']
             
             if error_code == 429:
-                print(f"Rate limit exceeded. Retrying in {backoff_time} seconds...", flush=True)
-                time.sleep(backoff_time)
-                backoff_time *= 2
+                rate_limit_attempts += 1
+                _sleep_backoff(rate_limit_attempts, deadline)
                 continue
             
             tries += 1
@@ -263,3 +326,56 @@ def complete_chat(model: Optional[str] = None, **kwargs) -> str:
                 raise
             continue
     return ""
+
+BATCH_POLL_INTERVAL = 5
+MAX_BATCH_POLL_INTERVAL = 60*5
+
+def complete_chat_batch(message_lists: List[List[Dict]], model: Optional[str] = None, **kwargs) -> List[str]:
+    """
+    Run many independent chat completions through the provider's Batch API.
+
+    Batches are billed at a discount and have their own rate limits, but may
+    take up to 24 hours, so this is only meant for non-interactive runs.
+    Returns the reply text for each message list, in order ("" for failures).
+    """
+    model_id = model or get_agent_model()
+    client, model_name = llm_manager.get_client_for_model(model_id)
+
+    requests_jsonl = b"\n".join(
+        orjson.dumps({
+            "custom_id": f"request-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {**kwargs, "model": model_name, "messages": messages},
+        })
+        for i, messages in enumerate(message_lists)
+    )
+    batch_file = client.files.create(file=("batch.jsonl", requests_jsonl), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+
+    poll_interval = BATCH_POLL_INTERVAL
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        poll_interval = min(MAX_BATCH_POLL_INTERVAL, poll_interval * 2)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} finished with status '{batch.status}'")
+
+    from .token_tracker import track_tokens
+    results = [""] * len(message_lists)
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = orjson.loads(line)
+        body = (record.get("response") or {}).get("body") or {}
+        if not body.get("choices"):
+            continue
+        track_tokens(body)
+        index = int(record["custom_id"].rsplit("-", 1)[1])
+        results[index] = body["choices"][0]["message"]["content"] or ""
+    return results
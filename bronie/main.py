@@ -7,7 +7,7 @@ import typer
 
 load_dotenv()
 
-def get_agent_system_prompt():
+def _build_agent_system_prompt():
     from .tools.registry import TOOLS
     import inspect
 
@@ -66,20 +66,59 @@ Use this JSON object to respond:
 
 Say nothing but the JSON object. Always use talk_to_user tool to talk. Don't talk until all the work is done.
 """
-    return {
-        "role": "system",
-        "content": PROMPT
-    }
+    return PROMPT
+
+# The prompt only depends on the tool registry, which is fixed at import time,
+# so build the message once instead of on every :clear.
+_SYSTEM_PROMPT = _build_agent_system_prompt()
+_SYSTEM_PROMPT_MSG = {
+    "role": "system",
+    "content": _SYSTEM_PROMPT
+}
+
+def get_agent_system_prompt():
+    return _SYSTEM_PROMPT_MSG
+
+def run_batch(path):
+    """Send every prompt in *path* as one Batch API job and print the replies.
+
+    Each line is either a JSON string (sent as a single user message) or an
+    object with a "messages" list.
+    """
+    import orjson
+    from .llm import complete_chat_batch
+
+    message_lists = []
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            if isinstance(item, str):
+                message_lists.append([{"role": "user", "content": item}])
+            else:
+                message_lists.append(item["messages"])
+
+    for reply in complete_chat_batch(message_lists):
+        print(orjson.dumps({"reply": reply}).decode())
 
 app = typer.Typer()
 
 @app.command()
-def main(project_dir: str = typer.Argument(None, help="The project directory to work in.")):
+def main(
+    project_dir: str = typer.Argument(None, help="The project directory to work in."),
+    exact_tokens: bool = typer.Option(False, "--exact-tokens", help="Count context tokens with the tokenizer instead of estimating."),
+    batch: str = typer.Option(None, "--batch", help="Run each prompt in this JSONL file through the provider's Batch API and print the replies as JSONL."),
+):
     """Main entry point - simplified to just setup and run agent"""
+    if batch is not None:
+        run_batch(batch)
+        return
+
     if project_dir is not None:
         os.chdir(project_dir)
     
-    agent = Agent(project_dir=project_dir, get_agent_system_prompt=get_agent_system_prompt)
+    agent = Agent(project_dir=project_dir, get_agent_system_prompt=get_agent_system_prompt, exact_tokens=exact_tokens)
     agent.run()
     
     # Show final token usage summary
@@ -1,7 +1,12 @@
 """token_tracker.py – centralises token usage tracking to avoid circular imports."""
 
-input_tokens = 0
-output_tokens = 0
+import array
+import threading
+
+# [input_tokens, output_tokens], mutated in place. The lock keeps increments
+# atomic now that completions and tools can run on worker threads.
+_counts = array.array('q', [0, 0])
+_lock = threading.Lock()
 
 def track_tokens(arg1, arg2=None):
     """Increment token counters.
@@ -10,7 +15,6 @@ def track_tokens(arg1, arg2=None):
     1. track_tokens(prompt_tokens, completion_tokens)
     2. track_tokens(response_data_dict_with_usage)
     """
-    global input_tokens, output_tokens
     if arg2 is None:
         response_data = arg1 if isinstance(arg1, dict) else {}
         usage = response_data.get("usage", {}) if response_data else {}
@@ -20,15 +24,16 @@ def track_tokens(arg1, arg2=None):
         prompt_tokens = int(arg1)
         completion_tokens = int(arg2)
 
-    input_tokens += prompt_tokens
-    output_tokens += completion_tokens
+    with _lock:
+        _counts[0] += prompt_tokens
+        _counts[1] += completion_tokens
 
 def get_totals():
     """Return (input_tokens, output_tokens)."""
-    return input_tokens, output_tokens
+    return _counts[0], _counts[1]
 
 def reset():
     """Reset token counters to zero."""
-    global input_tokens, output_tokens
-    input_tokens = 0
-    output_tokens = 0 
\ No newline at end of file
+    with _lock:
+        _counts[0] = 0
+        _counts[1] = 0
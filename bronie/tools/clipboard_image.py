@@ -4,66 +4,119 @@ import os
 import sys
 import tempfile
 import subprocess
-from PIL import ImageGrab
 
-def get_clipboard_image():
+def _read_macos_png_pyobjc():
     """
-    Get an image from the clipboard and convert it to base64.
+    Read PNG data straight from the macOS pasteboard, in-process.
     
     Returns:
-        tuple: (base64_string, mime_type) if successful, (None, None) if no image in clipboard
+        bytes or None: The PNG data, or None if the clipboard holds no PNG
+        
+    Raises:
+        ImportError: If pyobjc is not installed
+    """
+    from AppKit import NSPasteboard, NSPasteboardTypePNG
+    data = NSPasteboard.generalPasteboard().dataForType_(NSPasteboardTypePNG)
+    return bytes(data) if data is not None else None
+
+def _read_macos_png_osascript():
+    """
+    Read PNG data from the macOS clipboard by having osascript write it to a temp file.
+    
+    Returns:
+        bytes or None: The PNG data, or None if the clipboard holds no PNG
     """
+    # Create a temporary file
+    fd, path = tempfile.mkstemp(suffix='.png')
+    os.close(fd)
+    
     try:
-        # For macOS (darwin)
-        if sys.platform == 'darwin':
-            # Create a temporary file
-            fd, path = tempfile.mkstemp(suffix='.png')
-            os.close(fd)
-            
-            # Use osascript to save clipboard image to the temp file
-            script = f'''
-            set theFile to "{path}"
+        # Use osascript to save clipboard image to the temp file
+        script = f'''
+        set theFile to "{path}"
+        try
+            set theData to the clipboard as «class PNGf»
+            set theFile to open for access theFile with write permission
+            write theData to theFile
+            close access theFile
+            return true
+        on error
             try
-                set theData to the clipboard as «class PNGf»
-                set theFile to open for access theFile with write permission
-                write theData to theFile
                 close access theFile
-                return true
-            on error
-                try
-                    close access theFile
-                end try
-                return false
             end try
-            '''
-            result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
+            return false
+        end try
+        '''
+        result = subprocess.run(['osascript', '-e', script], capture_output=True, text=True)
+        
+        if result.stdout.strip() == 'true':
+            with open(path, 'rb') as f:
+                return f.read()
+        return None
+    finally:
+        os.unlink(path)  # Remove the temp file
+
+def get_clipboard_image_file():
+    """
+    Get the raw image bytes from the clipboard, without base64 encoding.
+    
+    Returns:
+        tuple: (image_bytes, mime_type) if successful, (None, None) if no image in clipboard
+    """
+    try:
+        # For macOS (darwin)
+        if sys.platform == 'darwin':
+            # Prefer reading the pasteboard in-process; fall back to spawning
+            # osascript when pyobjc isn't installed or finds no PNG, since
+            # osascript also converts other image types (e.g. TIFF) to PNG.
+            try:
+                image_data = _read_macos_png_pyobjc()
+            except ImportError:
+                image_data = None
+            if image_data is None:
+                image_data = _read_macos_png_osascript()
             
-            if result.stdout.strip() == 'true':
-                with open(path, 'rb') as f:
-                    image_data = f.read()
-                os.unlink(path)  # Remove the temp file
-                
-                # Convert to base64
-                base64_data = base64.b64encode(image_data).decode('utf-8')
-                return base64_data, 'image/png'
-            else:
-                os.unlink(path)  # Remove the temp file
-                return None, None
+            if image_data:
+                return image_data, 'image/png'
+            return None, None
                 
         # For Windows and Linux
         else:
+            from PIL import ImageGrab
             img = ImageGrab.grabclipboard()
+            # A copied PNG file comes back as a list of paths; forward its bytes
+            # as-is rather than decoding and re-encoding the image.
+            if isinstance(img, list):
+                png_paths = [p for p in img if p.lower().endswith('.png')]
+                if not png_paths:
+                    return None, None
+                with open(png_paths[0], 'rb') as f:
+                    return f.read(), 'image/png'
             if img is not None:
                 buffer = io.BytesIO()
-                img.save(buffer, format='PNG')
-                buffer.seek(0)
-                base64_data = base64.b64encode(buffer.read()).decode('utf-8')
-                return base64_data, 'image/png'
+                # The image is only sent to the model, so favour encode speed
+                # over file size.
+                img.save(buffer, format='PNG', compress_level=1, optimize=False)
+                return buffer.getvalue(), 'image/png'
             return None, None
     except Exception as e:
         print(f"Error getting clipboard image: {e}", flush=True)
         return None, None
 
+def get_clipboard_image():
+    """
+    Get an image from the clipboard and convert it to base64.
+    Chat completion APIs take images as base64 data URLs, so this is what the
+    :image command attaches.
+    
+    Returns:
+        tuple: (base64_string, mime_type) if successful, (None, None) if no image in clipboard
+    """
+    image_data, mime_type = get_clipboard_image_file()
+    if image_data is None:
+        return None, None
+    return base64.b64encode(image_data).decode('utf-8'), mime_type
+
 def is_image_in_clipboard():
     """
     Check if there is an image in the clipboard.
@@ -1,4 +1,4 @@
-import json
+import orjson
 import os
 
 # Determine the absolute path to config.json within the package
@@ -11,21 +11,36 @@ DEFAULT_AGENT_MODEL = 'openai/gpt-4o'
 DEFAULT_CODE_MODEL = 'anthropic/claude-3.5-sonnet'
 DEFAULT_LIGHT_MODEL = 'openrouter/google/gemini-flash-1.5'
 
+# Parsed config.json, reused until the file's mtime changes so the model
+# getters on the request path don't re-read and re-parse it every call.
+_config_cache = None
+_config_mtime = None
+
 def _load_config():
+    global _config_cache, _config_mtime
+    try:
+        mtime = os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return {}
+    if _config_cache is not None and mtime == _config_mtime:
+        return _config_cache
     try:
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        with open(CONFIG_FILE, 'rb') as f:
+            config = orjson.loads(f.read())
     except Exception:
-        pass
-    return {}
+        return {}
+    _config_cache, _config_mtime = config, mtime
+    return config
 
 def _save_config(config):
+    global _config_cache, _config_mtime
     try:
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
+        with open(CONFIG_FILE, 'wb') as f:
+            f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+        _config_cache, _config_mtime = config, os.stat(CONFIG_FILE).st_mtime_ns
     except Exception:
-        pass
+        # The setters changed the cached dict in place; re-read what's on disk
+        _config_cache = None
 
 def get_agent_model():
     config = _load_config()
@@ -73,13 +88,23 @@ DEFAULT_IGNORED_DIRS = {
 
 def get_ignored_dirs():
     config = _load_config()
-    return set(config.get('ignored_dirs', DEFAULT_IGNORED_DIRS))
+    # Only ever used for membership tests, once per directory entry
+    return frozenset(config.get('ignored_dirs', DEFAULT_IGNORED_DIRS))
 
 def set_ignored_dirs(dirs):
     config = _load_config()
     config['ignored_dirs'] = list(dirs)
     _save_config(config)
 
+# Extensions of files that can't hold text, so the tools skip them without reading
+BINARY_EXTS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.ico', '.webp', '.pdf',
+    '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.tar', '.jar', '.whl',
+    '.pyc', '.pyo', '.so', '.dll', '.dylib', '.exe', '.o', '.a', '.bin',
+    '.class', '.wasm', '.woff', '.woff2', '.ttf', '.otf', '.mp3', '.mp4', '.mov',
+    '.sqlite', '.db',
+})
+
 # Load ignored directories from config
 IGNORED_DIRS = get_ignored_dirs()
 
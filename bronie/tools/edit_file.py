@@ -1,11 +1,13 @@
 import base64
+import hashlib
 import os
+import re
+import shutil
+from functools import lru_cache
 from difflib import unified_diff
-from ..llm import complete_chat_stream
+from ..llm import complete_chat, complete_chat_stream
 from ..coders.editblock_coder import get_edits, apply_edits
-from rich.console import Console
 from .config import get_code_model
-import sys
 
 
 EDIT_PROMPT = """Act as an expert software developer.
@@ -43,40 +45,89 @@ Important:
 - If a block depends on another block, combine them into a single block
 - When copying code into SEARCH sections, copy it exactly as it appears - do not try to clean up or reformat the whitespace"""
 
-def get_image_mime_type(base64_data):
-    """Detects the MIME type of an image from its base64 encoded data."""
+# The prompt message is the same for every edit, so build it once.
+_STATIC_PREFIX = ({"role": "user", "content": [{"type": "text", "text": EDIT_PROMPT}]},)
+
+# Magic-number prefixes for the image formats the code model accepts. WebP is
+# checked separately since its marker sits after the RIFF chunk size.
+_MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+# 16 base64 characters decode to the 12 header bytes the checks need.
+_HEADER_B64_CHARS = 16
+
+@lru_cache(maxsize=128)
+def _mime_from_header(base64_header):
     try:
-        # Decode the base64 string, handling potential padding errors
-        # Ensure the padding is correct before decoding
-        missing_padding = len(base64_data) % 4
-        if missing_padding:
-            base64_data += '=' * (4 - missing_padding)
-        image_data = base64.b64decode(base64_data, validate=True)
+        header = base64.b64decode(base64_header, validate=True)
 
         # Check magic numbers
-        if image_data.startswith(b'\x89PNG\r\n\x1a\n'):
-            return 'image/png'
-        elif image_data.startswith(b'\xff\xd8\xff'):
-            return 'image/jpeg'
-        elif image_data.startswith(b'GIF87a') or image_data.startswith(b'GIF89a'):
-            return 'image/gif'
-        elif image_data.startswith(b'RIFF') and image_data[8:12] == b'WEBP':
-             return 'image/webp'
+        for prefix, mime_type in _MAGIC:
+            if header.startswith(prefix):
+                return mime_type
+        if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+            return 'image/webp'
         # Add checks for other formats like BMP, TIFF if needed
-        else:
-            # Default if format is unknown or add more specific error handling
-            print("Warning: Could not detect image format from base64 data. Defaulting to png.", flush=True)
-            return 'image/png'
+        # Default if format is unknown or add more specific error handling
+        print("Warning: Could not detect image format from base64 data. Defaulting to png.", flush=True)
+        return 'image/png'
     except Exception as e:
         # Handle potential base64 decoding errors
         print(f"Error decoding base64 or invalid image data: {e}", flush=True)
         # Return a default or raise a more specific error
         return 'image/png' # Defaulting to png on error
+
+def get_image_mime_type(base64_data):
+    """Detects the MIME type of an image from its base64 encoded data."""
+    # Only the header is needed, so decode just its leading characters rather
+    # than the whole image. Results are cached per header.
+    base64_header = base64_data[:_HEADER_B64_CHARS]
+    # Ensure the padding is correct before decoding
+    missing_padding = len(base64_header) % 4
+    if missing_padding:
+        base64_header += '=' * (4 - missing_padding)
+    return _mime_from_header(base64_header)
     
 def get_thinking(*_args, **_kwargs):
     """Deprecated placeholder kept for backward compatibility.\n    Should not be called – edit_file now uses streamed response text directly."""
     raise RuntimeError("get_thinking is deprecated and should not be used.")
 
+_DIFF_CONTEXT = 3
+# The start line numbers in a "@@ -12,7 +12,8 @@" hunk header
+_HUNK_START_RE = re.compile(r'(?<=[-+])\d+')
+
+def _common_prefix_len(a, b):
+    """Length of the longest common prefix of *a* and *b*, by binary search over slice compares."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _common_suffix_len(a, b, limit):
+    """Length of the longest common suffix of *a* and *b*, at most *limit*."""
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[-mid:] == b[-mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def _split_lines(text):
+    """Split *text* on newlines, ignoring a trailing one."""
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
 def diff(a: str, b: str) -> str:
     """
     Generate a git-style diff between two strings a and b.
@@ -85,21 +136,167 @@ def diff(a: str, b: str) -> str:
     :param b: Modified string
     :return: A git-style diff as a string
     """
-    a_lines = a.splitlines()
-    b_lines = b.splitlines()
+    # difflib's matcher gets slow on big files, but text shared at the start
+    # and end only matters as hunk context. Find it with C-level string
+    # compares, then split and diff just the changed middle (plus context)
+    # and shift the hunk line numbers back afterwards.
+    prefix = _common_prefix_len(a, b)
+    suffix = _common_suffix_len(a, b, min(len(a), len(b)) - prefix)
+    
+    # Widen the middle to whole lines plus context on each side
+    head = a.rfind('\n', 0, prefix) + 1
+    for _ in range(_DIFF_CONTEXT):
+        if not head:
+            break
+        head = a.rfind('\n', 0, head - 1) + 1
+    a_end = len(a) - suffix
+    for _ in range(_DIFF_CONTEXT + 1):
+        newline = a.find('\n', a_end)
+        if newline == -1:
+            a_end = len(a)
+            break
+        a_end = newline + 1
+    b_end = a_end + len(b) - len(a)
+    head_lines = a.count('\n', 0, head)
     
     # Use difflib to compute the differences
     diff_lines = unified_diff(
-        a_lines, 
-        b_lines, 
+        _split_lines(a[head:a_end]), 
+        _split_lines(b[head:b_end]), 
         lineterm='',  # Avoid adding extra newlines
         fromfile='a',
-        tofile='b'
+        tofile='b',
+        n=_DIFF_CONTEXT
     )
     
+    if head_lines:
+        shift = lambda m: str(int(m.group()) + head_lines)
+        diff_lines = (
+            _HUNK_START_RE.sub(shift, line) if line.startswith('@@') else line
+            for line in diff_lines
+        )
+    
     # Join the result to form a single string
     return '\n'.join(diff_lines)
 
+def _stream_response(messages, code_model):
+    """Stream the code model's reply to the console and return its full text, or None if interrupted."""
+    # Stream the response in real-time and allow user interruption via Ctrl+C
+    try:
+        response_parts = []
+        for chunk in complete_chat_stream(messages=messages, model=code_model):
+            print(chunk, end="", flush=True)
+            response_parts.append(chunk)
+            # Note: Ctrl+D detection removed as it's not compatible with Windows
+            # Users can use Ctrl+C to interrupt instead
+    except (EOFError, KeyboardInterrupt):
+        # Gracefully handle user interrupt and cancel the edit operation
+        print("\n[Stream interrupted by user – edit cancelled]", flush=True)
+        return None
+    return "".join(response_parts)
+
+# Contents of recently read or written files as {path: ((st_mtime_ns, st_size), code)},
+# so back-to-back edits to the same file skip re-reading and decoding it.
+_FILE_CACHE_SIZE = 64
+_file_cache = {}
+
+def _cache_code(filepath, st, code):
+    if len(_file_cache) >= _FILE_CACHE_SIZE and filepath not in _file_cache:
+        _file_cache.clear()
+    _file_cache[filepath] = ((st.st_mtime_ns, st.st_size), code)
+
+def _read_code(filepath):
+    """Return the contents of *filepath*, or "" for a new file, creating its directories."""
+    # Create directories if they don't exist
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    
+    try:
+        st = os.stat(filepath)
+        cached = _file_cache.get(filepath)
+        if cached and cached[0] == (st.st_mtime_ns, st.st_size):
+            return cached[1]
+        # A binary read() is a single read sized from fstat; text mode would
+        # decode in 8 KB chunks into a growing buffer
+        with open(filepath, 'rb') as f:
+            code = f.read().decode('utf-8', errors='replace')
+    except FileNotFoundError:
+        return ""
+    if '\r' in code:
+        # Match text mode's universal newlines
+        code = code.replace('\r\n', '\n').replace('\r', '\n')
+    _cache_code(filepath, st, code)
+    return code
+
+_DIFF_STYLES = {'+': "green", '-': "red", '@': "yellow"}
+
+def _print_diff(diff_output):
+    """Print a diff with added, removed and hunk header lines coloured."""
+    # rich is only needed once there is a diff to show
+    from rich.console import Console
+    from rich.text import Text
+    console = Console()
+    console.print("\n[bold green]Changes:[/bold green]")
+    # Build one Text and print it once rather than a print (and markup parse)
+    # per line; this also keeps brackets in code from being read as markup.
+    text = Text()
+    for line in diff_output.split('\n'):
+        text.append(line, style=_DIFF_STYLES.get(line[:1]))
+        text.append('\n')
+    text.rstrip()
+    console.print(text)
+
+def _atomic_write(filepath, text):
+    """Write *text* to *filepath* via a temp file and os.replace, so a crash never leaves it half-written."""
+    # Write through a symlink to its target rather than replacing the link
+    filepath = os.path.realpath(filepath)
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    # Encode once and hand the bytes to a single write
+    data = text.encode('utf-8')
+    try:
+        st = os.stat(filepath)
+    except FileNotFoundError:
+        st = None
+    if st is not None and st.st_nlink > 1:
+        # Replacing would detach the file from its other hard links, so
+        # update the shared inode in place as a plain write does
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        return
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        if st is not None:
+            # Keep the original permissions (e.g. executable scripts)
+            shutil.copymode(filepath, tmp_path)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def _write_changes(filepath, code, new_code):
+    """Show and write *new_code* if it differs from *code*. Returns the diff ("" if unchanged)."""
+    if new_code == code:
+        return ""
+    diff_output = diff(code, new_code)
+    if diff_output:
+        _print_diff(diff_output)
+
+    print(f"\nWriting to {filepath}", flush=True)
+    _atomic_write(filepath, new_code)
+    _cache_code(filepath, os.stat(filepath), new_code)
+    return diff_output
+
+# Code produced by recent successful edits, keyed by a digest of the original
+# code and the instructions
+_EDIT_CACHE_SIZE = 64
+_edit_cache = {}
+
+def _edit_key(code, instructions):
+    return hashlib.blake2b(f"{code}\0{instructions}".encode('utf-8'), digest_size=16).digest()
+
 def edit_file(target_file, instructions, images=None):
     """
     Edit a file by applying changes based on natural language instructions.
@@ -119,80 +316,67 @@ def edit_file(target_file, instructions, images=None):
     Returns:
         tuple: (stdout, stderr) - On success, stdout contains the git-style diff (may be empty if no changes) while stderr is empty; on failure, stderr contains the error message.
     """
+    if not instructions or not instructions.strip():
+        # Nothing to ask the code model for
+        return "Error editing file: no instructions given", ""
     try:
         # Ensure the path is relative to the current working directory
         # which should be the project directory set in main.py
         filepath = os.path.join(os.getcwd(), target_file)
         
-        # Create directories if they don't exist
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        try:
-            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-                code = f.read()
-        except FileNotFoundError:
-            code = ""
+        code = _read_code(filepath)
 
         print(f"Instructions: {instructions}", flush=True)
         
-        diff_output = ""
+        # The same instructions on the same code (e.g. a retry after the file
+        # was reverted) reuse the earlier result instead of another LLM call
+        edit_key = None if images else _edit_key(code, instructions)
+        if edit_key in _edit_cache:
+            print("[Reusing the result of an identical earlier edit]", flush=True)
+            return _write_changes(filepath, code, _edit_cache[edit_key]), ""
         
         # Construct messages for the chat
         messages = [
-            {"role": "user", "content": [{"type": "text", "text": EDIT_PROMPT}]},
+            *_STATIC_PREFIX,
             {"role": "user", "content": [{"type": "text", "text": f"""Code:\n{code}\n\n{instructions}"""}]}
         ]
 
         if images:
-            for img_base64 in images:
-                # Detect the MIME type of the image
-                mime_type = get_image_mime_type(img_base64)
-                messages[-1]['content'].append({
+            # MIME detection only decodes each image's header, so it is cheap
+            # enough to run inline
+            messages[-1]['content'].extend(
+                {
                     "type": "image_url",
-                    "image_url": {"url": f"data:{mime_type};base64,{img_base64}"}
-                })
+                    "image_url": {"url": f"data:{get_image_mime_type(img_base64)};base64,{img_base64}"}
+                }
+                for img_base64 in images
+            )
         
                 # Get the user-selected code model
         code_model = get_code_model()
         
-        # Stream the response in real-time and allow user interruption via Ctrl+C
-        try:
-            response_text = ""
-            for chunk in complete_chat_stream(messages=messages, model=code_model):
-                print(chunk, end="", flush=True)
-                response_text += chunk
-                # Note: Ctrl+D detection removed as it's not compatible with Windows
-                # Users can use Ctrl+C to interrupt instead
-        except (EOFError, KeyboardInterrupt):
-            # Gracefully handle user interrupt and cancel the edit operation
-            print("\n[Stream interrupted by user – edit cancelled]", flush=True)
+        response = _stream_response(messages, code_model)
+        if response is None:
             return "", ""
         
         # Use the streamed response for processing (avoid a second inference call)
-        response = response_text
-        edits = get_edits(response)
+        try:
+            edits = get_edits(response)
+        except ValueError:
+            edits = None
+        if edits is None or (not edits and "<<<<<<< SEARCH" in response):
+            # Blocks were started but don't parse, most likely a cut-off
+            # stream; retry once without streaming.
+            print("\n[Edit blocks incomplete – retrying without streaming]", flush=True)
+            response = complete_chat(messages=messages, model=code_model)
+            edits = get_edits(response)
         new_code = apply_edits(code, edits)
+        if edit_key is not None and new_code != code:
+            # Only successful edits are kept, so a failed edit can be retried
+            if len(_edit_cache) >= _EDIT_CACHE_SIZE:
+                _edit_cache.clear()
+            _edit_cache[edit_key] = new_code
 
-        if new_code != code:
-            diff_output = diff(code, new_code)
-            console = Console()
-            if diff_output:
-                console.print("\n[bold green]Changes:[/bold green]")
-                for line in diff_output.splitlines():
-                    if line.startswith('+'):
-                        console.print(line, style="green")
-                    elif line.startswith('-'):
-                        console.print(line, style="red")
-                    elif line.startswith('@'):
-                        console.print(line, style="yellow")
-                    else:
-                        console.print(line)
-
-            print(f"\nWriting to {filepath}", flush=True)
-            with open(filepath, 'w+', encoding='utf-8') as f:
-                f.write(new_code)
-            return diff_output, ""
-        else:
-            return diff_output, ""
+        return _write_changes(filepath, code, new_code), ""
     except Exception as e:
         return f"Error editing file: {e}", ""
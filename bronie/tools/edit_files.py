@@ -0,0 +1,92 @@
+import os
+import re
+from ..coders.editblock_coder import get_edits, apply_edits
+from .config import get_code_model
+from .edit_file import _STATIC_PREFIX, _read_code, _stream_response, _write_changes, edit_file
+
+# Each file in a batched prompt (and its blocks in the reply) is introduced by
+# one of these header lines.
+_FILE_HEADER = "=== FILE: {} ==="
+_FILE_HEADER_RE = re.compile(r'^=== FILE: (.+?) ===[ \t]*$', re.MULTILINE)
+
+_BATCH_NOTE = """Several files are supplied below, each introduced by a `=== FILE: <path> ===` line followed by its own instructions and code.
+In your answer, write the same `=== FILE: <path> ===` line before the *SEARCH/REPLACE blocks* for that file, and only include blocks for files listed here."""
+
+def _split_by_file(response):
+    """Map each file header in *response* (normalised, so ./x.py is x.py) to the text that follows it."""
+    pieces = _FILE_HEADER_RE.split(response)
+    sections = {}
+    # pieces is [preamble, path1, body1, path2, body2, ...]
+    for path, body in zip(pieces[1::2], pieces[2::2]):
+        path = os.path.normpath(path.strip())
+        sections[path] = sections.get(path, "") + body
+    return sections
+
+def edit_files(edits):
+    """
+    Edit several files with a single request to the code model.
+    Use this instead of multiple edit_file calls when one change spans several files.
+    Like edit_file, it doesn't know about the rest of the code base, so each file's
+    instructions must include everything necessary to make its changes.
+
+    Args:
+        edits (list): List of {"target_file": str, "instructions": str} objects, one per file
+
+    Returns:
+        dict: Maps each target_file to its git-style diff (empty if unchanged) or an error message.
+    """
+    try:
+        items = [(edit["target_file"], edit["instructions"]) for edit in edits]
+        if len(items) == 1:
+            stdout, stderr = edit_file(*items[0])
+            return {items[0][0]: stderr or stdout}
+
+        # Like edit_file, there's nothing to ask the code model for these
+        results = {
+            target: "Error editing file: no instructions given"
+            for target, instructions in items
+            if not instructions or not instructions.strip()
+        }
+        items = [(target, instructions) for target, instructions in items if target not in results]
+        if not items:
+            return results
+
+        # Ensure the paths are relative to the current working directory
+        # which should be the project directory set in main.py
+        project_dir = os.getcwd()
+        filepaths = {target: os.path.join(project_dir, target) for target, _ in items}
+        codes = {target: _read_code(filepaths[target]) for target, _ in items}
+
+        prompt = "\n\n".join(
+            f"{_FILE_HEADER.format(target)}\nInstructions: {instructions}\nCode:\n{codes[target]}"
+            for target, instructions in items
+        )
+        for target, instructions in items:
+            print(f"Instructions for {target}: {instructions}", flush=True)
+
+        messages = [
+            *_STATIC_PREFIX,
+            {"role": "user", "content": [{"type": "text", "text": f"{_BATCH_NOTE}\n\n{prompt}"}]}
+        ]
+
+        response = _stream_response(messages, get_code_model())
+        if response is None:
+            results.update((target, "") for target, _ in items)
+            return results
+
+        sections = _split_by_file(response)
+        for target, _ in items:
+            section = sections.get(os.path.normpath(target))
+            if section is None:
+                # Missing or misnamed header; don't report that as "unchanged"
+                results[target] = "Error editing file: the reply had no section for this file"
+                continue
+            try:
+                file_edits = get_edits(section)
+                new_code = apply_edits(codes[target], file_edits)
+                results[target] = _write_changes(filepaths[target], codes[target], new_code)
+            except Exception as e:
+                results[target] = f"Error editing file: {e}"
+        return results
+    except Exception as e:
+        return {"error": f"Error editing files: {e}"}
@@ -1,28 +1,138 @@
+import os
+import shlex
+import shutil
+import signal
 import subprocess
-from .talk_to_user import talk_to_user
+import threading
+from functools import lru_cache
 
-def exec_shell(command):
+# Each output stream is capped so a runaway command can't exhaust memory; the
+# command is stopped once it writes more than this.
+MAX_OUTPUT_BYTES = 1 << 20
+DEFAULT_TIMEOUT = 300
+_READ_SIZE = 1 << 16
+# Seconds to keep reading a killed command's pipes
+_KILL_GRACE = 1
+
+# Anything beyond plain words and quoting needs /bin/sh to interpret it.
+_SHELL_CHARS = frozenset('|&;<>()$`\\*?[]{}~#\n')
+
+@lru_cache(maxsize=128)
+def _which(name):
+    return shutil.which(name)
+
+def _direct_argv(command):
+    """Return *command* as an argv list if it can run without a shell, else None."""
+    if os.name != 'posix' or not _SHELL_CHARS.isdisjoint(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None  # Unbalanced quotes; let the shell report it
+    # Env assignments (FOO=1 cmd) and builtins (cd, export, ...) need the shell
+    if not argv or '=' in argv[0] or _which(argv[0]) is None:
+        return None
+    return argv
+
+def _kill(proc):
+    """Stop *proc* and anything it spawned."""
+    try:
+        if os.name == 'posix' and isinstance(proc.args, str):
+            # Shell commands run in their own session, so this reaches the shell's children too
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except OSError:
+        pass  # Already exited
+
+def _read_stream(stream, chunks, proc, truncated):
+    """Collect up to MAX_OUTPUT_BYTES from *stream*, killing *proc* if it writes more."""
+    size = 0
+    for chunk in iter(lambda: stream.read1(_READ_SIZE), b''):
+        if size < MAX_OUTPUT_BYTES:
+            chunks.append(chunk[:MAX_OUTPUT_BYTES - size])
+        size += len(chunk)
+        if size > MAX_OUTPUT_BYTES and not truncated:
+            truncated.append(True)
+            _kill(proc)
+    stream.close()
+
+def exec_shell(command, timeout=DEFAULT_TIMEOUT):
     """
     Execute a shell command and return the results.
     Runs commands in the current working directory (project directory).
     Captures both stdout and stderr, and provides formatted output.
-    
+    Commands get no stdin, are stopped after `timeout` seconds, and are stopped
+    if either stream exceeds 1 MB of output.
+
     Args:
         command (str): The shell command to execute (e.g., "ls -la", "git status")
-        
+        timeout (int, optional): Seconds to wait before stopping the command. Defaults to 300.
+
     Returns:
         dict: Dictionary containing:
             - stdout (str): Standard output from command (with trailing whitespace stripped)
             - stderr (str): Standard error from command (with trailing whitespace stripped)
             - formatted_output (str): Combined stdout and stderr output (with whitespace stripped)
     """
-    result = subprocess.run(command, shell=True, capture_output=True, text=True, encoding='utf-8')
-    
+    # Simple commands are exec'd directly, skipping a /bin/sh startup
+    proc = None
+    argv = _direct_argv(command)
+    if argv is not None:
+        # An absolute executable, inherited fds and no new session let
+        # subprocess use posix_spawn (vfork) rather than fork(), which has
+        # to copy the agent's page tables
+        try:
+            proc = subprocess.Popen(
+                argv, executable=_which(argv[0]), close_fds=False,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+        except OSError:
+            # A script without a shebang (ENOEXEC, which sh runs itself) or a
+            # binary removed since _which cached it: leave it to the shell
+            _which.cache_clear()
+    if proc is None:
+        proc = subprocess.Popen(
+            command, shell=True,
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=(os.name == 'posix')
+        )
+
+    # Drain both pipes concurrently so neither can fill up and block the command
+    stdout_chunks, stderr_chunks, truncated = [], [], []
+    readers = [
+        threading.Thread(target=_read_stream, args=(proc.stdout, stdout_chunks, proc, truncated), daemon=True),
+        threading.Thread(target=_read_stream, args=(proc.stderr, stderr_chunks, proc, truncated), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
+    try:
+        proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        _kill(proc)
+        proc.wait()
+    except KeyboardInterrupt:
+        _kill(proc)
+        raise
+    # Killing a direct command doesn't reach its children, and a background
+    # one can hold the pipes open long after. Don't wait for it; closing the
+    # pipes under the readers would block on their read just the same.
+    grace = _KILL_GRACE if timed_out or truncated else None
+    for reader in readers:
+        reader.join(grace)
+
     # Strip whitespace but preserve line structure
-    stdout = result.stdout.rstrip()
-    stderr = result.stderr.rstrip()
+    stdout = b"".join(stdout_chunks).decode('utf-8', errors='replace').rstrip()
+    stderr = b"".join(stderr_chunks).decode('utf-8', errors='replace').rstrip()
+    if truncated:
+        stderr = f"{stderr}\n[Output exceeded {MAX_OUTPUT_BYTES} bytes – command stopped]".lstrip()
+    if timed_out:
+        stderr = f"{stderr}\n[Command timed out after {timeout} seconds]".lstrip()
     combined = f"{stdout}\n{stderr}".strip()
-    
+
     return {
         'stdout': stdout,
         'stderr': stderr,
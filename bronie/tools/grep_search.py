@@ -1,8 +1,82 @@
+import base64
+import fnmatch
+import io
 import os
 import re
 import subprocess
-from pathlib import Path
-from .config import IGNORED_DIRS_GLOB, IGNORED_DIRS
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from .config import IGNORED_DIRS_GLOB, IGNORED_DIRS, BINARY_EXTS
+from .search_utils import (
+    LINE_END_RE, LINE_ONLY_RE, SCAN_WORKERS, compile_pattern, decode_text, read_text_bytes
+)
+
+# Like rg, the fallback skips files that can't hold searchable text: known
+# binary extensions, anything over _MAX_FILE_SIZE, and binary content.
+_MAX_FILE_SIZE = 5_000_000
+
+_RG_MATCH_PREFIX = b'{"type":"match"'
+
+def _rg_text(field):
+    """Decode an `rg --json` text field, which is base64 "bytes" when not valid UTF-8."""
+    if 'text' in field:
+        return field['text']
+    return base64.b64decode(field['bytes']).decode('utf-8', errors='replace')
+
+def _walk_files(root, file_pattern):
+    """Yield paths under *root* matching *file_pattern*, pruning IGNORED_DIRS as the walk goes."""
+    # Like rg's --glob, a pattern with a slash is matched against the relative path.
+    match_rel = '/' in file_pattern
+    # entry.path is root joined with the relative path, so slicing off the
+    # prefix is the relative path without relpath's normalisation
+    prefix_len = len(os.path.join(root, ''))
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in IGNORED_DIRS:
+                            stack.append(entry.path)
+                    elif entry.is_file():
+                        if os.path.splitext(entry.name)[1].lower() in BINARY_EXTS:
+                            continue
+                        name = entry.path[prefix_len:] if match_rel else entry.name
+                        # _scan_file checks the size once the file is open,
+                        # so files the pattern rules out are never stat'ed
+                        if fnmatch.fnmatch(name, file_pattern):
+                            yield entry.path
+        except OSError:
+            continue
+
+def _scan_file(path, rel_path, search, file_search):
+    """Return the grep_search matches for a single file.
+
+    *file_search* runs once over the whole file first, so files without any
+    match (usually most of them) never get split into lines.
+    """
+    matches = []
+    try:
+        data = read_text_bytes(path, _MAX_FILE_SIZE)
+        if data is None:
+            return matches  # Binary or too large
+        text = decode_text(data)
+        if file_search is not None and not file_search(text):
+            return matches
+        for i, line in enumerate(io.StringIO(text), 1):
+            if search(line):
+                matches.append({
+                    'filename': rel_path,
+                    'line_number': i,
+                    'line_text': line.rstrip()
+                })
+    except Exception as e:
+        matches.append({
+            'filename': rel_path,
+            'line_number': 0,
+            'line_text': f"Error reading file: {e}"
+        })
+    return matches
 
 def grep_search(pattern, file_pattern="*"):
     """
@@ -26,33 +100,34 @@ def grep_search(pattern, file_pattern="*"):
         
         # Try to use ripgrep if available
         try:
-            # Build ripgrep command with ignore patterns
+            # Build ripgrep command with ignore patterns. --json gives one
+            # structured event per line, so filenames containing ':' parse fine.
             cmd = [
                 "rg",
+                "--json",  # NDJSON events instead of path:line:text
                 "--glob", file_pattern,  # File pattern
                 "--glob", IGNORED_DIRS_GLOB,  # Ignore patterns
-                "--no-heading",  # Don't group matches by file
-                "--line-number",  # Show line numbers
-                "--color", "never",  # No color codes in output
                 pattern,  # Search pattern
                 "."  # Search in current directory
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30, encoding='utf-8')
+            result = subprocess.run(cmd, capture_output=True, timeout=30)
             if result.returncode in [0, 1]:  # rg returns 1 if no matches found
-                if not result.stdout:
-                    return []
                 matches = []
                 for line in result.stdout.splitlines():
-                    if ':' in line:
-                        filename, rest = line.split(':', 1)
-                        if ':' in rest:
-                            line_number, line_text = rest.split(':', 1)
-                            matches.append({
-                                'filename': filename.lstrip('./'),
-                                'line_number': int(line_number),
-                                'line_text': line_text.strip()
-                            })
+                    # rg writes "type" first, so begin/end/summary events can
+                    # be skipped on the raw bytes without parsing them
+                    if not line.startswith(_RG_MATCH_PREFIX):
+                        continue
+                    data = orjson.loads(line)['data']
+                    filename = _rg_text(data['path'])
+                    if filename.startswith('./'):
+                        filename = filename[2:]
+                    matches.append({
+                        'filename': filename,
+                        'line_number': data['line_number'],
+                        'line_text': _rg_text(data['lines']).strip()
+                    })
                 return matches
             else:
                 # Fall back to Python implementation if ripgrep fails
@@ -63,33 +138,19 @@ def grep_search(pattern, file_pattern="*"):
                 
         # Python-based implementation (fallback)
         matches = []
-        cwd = Path(project_dir)
+        search = compile_pattern(pattern).search
+        if LINE_ONLY_RE.search(pattern) or LINE_END_RE.search(pattern):
+            file_search = None
+        else:
+            file_search = compile_pattern(pattern, re.MULTILINE).search
         
-        for path in cwd.rglob(file_pattern):
-            # Skip ignored directories
-            if any(ignored in str(path.parent).split(os.sep) for ignored in IGNORED_DIRS):
-                continue
-                
-            if path.is_file():
-                try:
-                    with open(path, 'r', encoding='utf-8', errors='replace') as f:
-                        for i, line in enumerate(f, 1):
-                            if re.search(pattern, line):
-                                # Convert path to be relative to project directory
-                                rel_path = str(path.relative_to(cwd))
-                                matches.append({
-                                    'filename': rel_path,
-                                    'line_number': i,
-                                    'line_text': line.rstrip()
-                                })
-                except Exception as e:
-                    # Convert path to be relative to project directory
-                    rel_path = str(path.relative_to(cwd))
-                    matches.append({
-                        'filename': rel_path,
-                        'line_number': 0,
-                        'line_text': f"Error reading file: {e}"
-                    })
+        paths = list(_walk_files(project_dir, file_pattern))
+        # Walked paths all start with project_dir, so the relative path is a slice
+        prefix_len = len(os.path.join(project_dir, ''))
+        # map() keeps results in walk order
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+            for hits in executor.map(lambda path: _scan_file(path, path[prefix_len:], search, file_search), paths):
+                matches.extend(hits)
         
         return matches
             
@@ -1,22 +1,55 @@
 import os
-from pathlib import Path
-from .config import IGNORED_DIRS
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from .config import IGNORED_DIRS, BINARY_EXTS
+from .search_utils import SCAN_WORKERS
 
-def count_lines(file_path):
+_COUNT_CHUNK_SIZE = 1 << 20
+_MAX_COUNT_SIZE = 1 << 20
+_SNIFF_BYTES = 8192
+# Smaller files are counted inline; handing them to a worker costs more than the read
+_INLINE_COUNT_SIZE = 4096
+
+def count_lines(file_path, size=None):
     """
     Count the number of lines in a file.
     
     Args:
         file_path (str or Path): Path to the file
+        size (int, optional): File size in bytes, if already known from a stat
         
     Returns:
-        int: Number of lines in the file
+        int or None: Number of lines in the file, or None for binary files and
+        files over 1 MiB, whose line counts aren't worth reading them for
     """
+    if size is not None and size > _MAX_COUNT_SIZE:
+        return None
+    # Counting newline bytes is a C-level memchr loop per chunk, far cheaper
+    # than decoding the file and iterating it line by line.
+    lines = 0
+    chunk = b''
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-            return sum(1 for _ in f)
+        with open(file_path, 'rb', buffering=0) as f:
+            read = f.read
+            data = read(_COUNT_CHUNK_SIZE)
+            if b'\x00' in data[:_SNIFF_BYTES]:
+                return None  # Binary file
+            while data:
+                lines += data.count(b'\n')
+                chunk = data
+                data = read(_COUNT_CHUNK_SIZE)
     except Exception:
         return 0
+    # A final line without a trailing newline still counts
+    if chunk and not chunk.endswith(b'\n'):
+        lines += 1
+    return lines
+
+@lru_cache(maxsize=8192)
+def _count_lines_cached(file_path, mtime_ns, size):
+    """count_lines, memoised on the file's mtime and size so unchanged files aren't re-read."""
+    return count_lines(file_path, size)
 
 def list_files(directory_path='.'):
     """
@@ -34,47 +67,77 @@ def list_files(directory_path='.'):
                 - name: File or directory name
                 - type: 'file' or 'directory'
                 - size: File size in bytes (0 for directories)
-                - lines: Number of lines in file (0 for directories)
+                - lines: Number of lines in file (0 for directories, None for binary files and files over 1 MiB)
             - error: Error message if operation fails
     """
     try:
         # Convert to absolute path if relative
-        # Ensure the path is relative to the current working directory
-        # which should be the project directory set in main.py
-        directory_path = os.path.join(os.getcwd(), directory_path)
+        # abspath resolves against the current working directory, which
+        # should be the project directory set in main.py
         abs_path = os.path.abspath(directory_path)
         
-        if not os.path.exists(abs_path):
-            return f"Directory not found: {directory_path}"
+        # One stat answers both "exists" and "is a directory"
+        try:
+            dir_st = os.stat(abs_path)
+        except OSError:
+            return f"Directory not found: {abs_path}"
             
-        if not os.path.isdir(abs_path):
-            return f"Not a directory: {directory_path}"
+        if not stat.S_ISDIR(dir_st.st_mode):
+            return f"Not a directory: {abs_path}"
             
         # Get all files and directories in the specified path
         entries = []
+        # Files big enough to be worth counting on the thread pool, as (entry dict, path, stat)
+        pending_counts = []
         
-        for entry in os.scandir(abs_path):
-            # Skip ignored directories
-            if entry.is_dir() and entry.name in IGNORED_DIRS:
-                continue
-                
-            if entry.is_file():
-                line_count = count_lines(entry.path)
-                size = entry.stat().st_size
-                entries.append({
-                    'name': entry.name,
+        # Read the whole listing up front; the with block closes the directory
+        # handle before any files are opened for counting
+        with os.scandir(abs_path) as it:
+            dir_entries = list(it)
+        
+        for entry in dir_entries:
+            name = entry.name
+            # is_dir()/is_file() come from the directory listing itself on most
+            # platforms, so files get the only stat() call, made once and
+            # reused for both size and the line-count cache key
+            if entry.is_dir():
+                # Skip ignored directories
+                if name not in IGNORED_DIRS:
+                    entries.append({
+                        'name': name,
+                        'type': 'directory',
+                        'size': 0,
+                        'lines': 0
+                    })
+            elif entry.is_file():
+                st = entry.stat()
+                size = st.st_size
+                file_entry = {
+                    'name': name,
                     'type': 'file',
                     'size': size,
-                    'lines': line_count
-                })
-            elif entry.is_dir():
-                entries.append({
-                    'name': entry.name,
-                    'type': 'directory',
-                    'size': 0,
                     'lines': 0
-                })
+                }
+                if not size or os.path.splitext(name)[1].lower() in BINARY_EXTS:
+                    # Empty files have no lines, and binary ones report None
+                    # like count_lines would, both without opening the file
+                    if size:
+                        file_entry['lines'] = None
+                elif size >= _INLINE_COUNT_SIZE:
+                    pending_counts.append((file_entry, entry.path, st))
+                else:
+                    file_entry['lines'] = _count_lines_cached(entry.path, st.st_mtime_ns, size)
+                entries.append(file_entry)
                 
+        if pending_counts:
+            with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+                counts = executor.map(
+                    lambda pending: _count_lines_cached(pending[1], pending[2].st_mtime_ns, pending[2].st_size),
+                    pending_counts
+                )
+                for (file_entry, _, _), line_count in zip(pending_counts, counts):
+                    file_entry['lines'] = line_count
+        
         # Sort entries: directories first, then files, both alphabetically
         entries.sort(key=lambda e: (e['type'] != 'directory', e['name'].lower()))
         
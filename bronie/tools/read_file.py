@@ -1,4 +1,16 @@
 import os
+import stat
+from itertools import islice
+from .list_files import count_lines
+
+def _to_line_number(value, label):
+    """Return *value* as an int (None stays None); raises ValueError with a message for the model."""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {label}: {value}. Must be an integer.") from None
 
 def read_file(filename, start_line=None, end_line=None):
     """
@@ -16,83 +28,78 @@ def read_file(filename, start_line=None, end_line=None):
             - If no line range specified: Returns file contents as string
             - If line range specified: Returns dict with:
                 - filename: File path
-                - total_lines: Total number of lines in file
+                - total_lines: Total number of lines in file (None if the range ends before the end of a binary file or one over 1 MiB)
                 - start_line: First line read (1-indexed)
                 - end_line: Last line read (1-indexed)
                 - lines: List of dicts with line_number and text
             - Error string if file cannot be read
     """
     try:
-        # Ensure the path is relative to the current working directory
-        # which should be the project directory set in main.py
-        filepath = os.path.join(os.getcwd(), filename)
+        # abspath resolves against the current working directory, which
+        # should be the project directory set in main.py
+        filepath = os.path.abspath(filename)
         
-        if not os.path.exists(filepath):
+        # One stat answers both "exists" and "is a regular file"
+        try:
+            st = os.stat(filepath)
+        except OSError:
             return f"File not found: {filename}"
             
-        if not os.path.isfile(filepath):
+        if not stat.S_ISREG(st.st_mode):
             return f"Not a file: {filename}"
             
         # Convert to integers if provided as strings
-        if start_line is not None and isinstance(start_line, str):
-            try:
-                start_line = int(start_line)
-            except ValueError:
-                return f"Invalid start line: {start_line}. Must be an integer."
-                
-        if end_line is not None and isinstance(end_line, str):
-            try:
-                end_line = int(end_line)
-            except ValueError:
-                return f"Invalid end line: {end_line}. Must be an integer."
+        try:
+            start_line = _to_line_number(start_line, "start line")
+            end_line = _to_line_number(end_line, "end line")
+        except ValueError as e:
+            return str(e)
         
-        # Read the entire file
         with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            lines = f.readlines()
-            
-        total_lines = len(lines)
-        
-        # If no range specified, return the entire file
-        if start_line is None and end_line is None:
-            return ''.join(lines)
-            
-        # Adjust for 1-indexed input
-        if start_line is not None:
-            start_idx = max(0, start_line - 1)  # Convert to 0-indexed
-        else:
-            start_idx = 0
+            # If no range specified, return the entire file
+            if start_line is None and end_line is None:
+                return f.read()
             
-        if end_line is not None:
-            end_idx = min(total_lines, end_line)  # Convert to 0-indexed + 1
-        else:
-            end_idx = total_lines
-            
-        # Validate range
-        if start_idx >= total_lines:
-            return f"Start line {start_line} is beyond the end of the file ({total_lines} lines)."
-            
-        if start_idx > end_idx:
-            return f"Start line {start_line} is greater than end line {end_line}."
+            # Adjust for 1-indexed input
+            if start_line is not None:
+                start_idx = max(0, start_line - 1)  # Convert to 0-indexed
+            else:
+                start_idx = 0
+                
+            # Read no further than the end of the range, so a short range near
+            # the top of a huge file doesn't read the rest of it
+            stop = None if end_line is None else max(end_line, start_idx)
+            selected_lines = list(islice(f, start_idx, stop))
+            end_idx = start_idx + len(selected_lines)
             
-        # Extract the requested lines
-        selected_lines = lines[start_idx:end_idx]
+            if not selected_lines:
+                # Nothing read: count the file to tell an empty range from a start past the end
+                f.seek(0)
+                total_lines = sum(1 for _ in f)
+            elif stop is None or end_idx < stop:
+                # The range ran into the end of the file, so the total is already known
+                total_lines = end_idx
+            else:
+                # Lines remain past the range; only count them when that's cheap
+                # (None for binary files and files over 1 MiB)
+                total_lines = count_lines(filepath, st.st_size)
+                
+            # Validate range
+            if not selected_lines and start_idx >= total_lines:
+                return f"Start line {start_line} is beyond the end of the file ({total_lines} lines)."
+                
+            if end_line is not None and start_idx > end_line:
+                return f"Start line {start_line} is greater than end line {end_line}."
         
         # Prepare the output dictionary
-        if start_line is None and end_line is None:
-            return {
-                'filename': filename,
-                'total_lines': total_lines,
-                'lines': [{'line_number': i+1, 'text': line} for i, line in enumerate(lines)]
-            }
-        else:
-            return {
-                'filename': filename,
-                'total_lines': total_lines,
-                'start_line': start_idx + 1,
-                'end_line': end_idx,
-                'lines': [{'line_number': i, 'text': line} 
-                         for i, line in enumerate(selected_lines, start=start_idx + 1)]
-            }
+        return {
+            'filename': filename,
+            'total_lines': total_lines,
+            'start_line': start_idx + 1,
+            'end_line': end_idx,
+            'lines': [{'line_number': i, 'text': line} 
+                     for i, line in enumerate(selected_lines, start=start_idx + 1)]
+        }
             
     except Exception as e:
         return f"Error reading file: {e}"
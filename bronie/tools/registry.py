@@ -3,6 +3,16 @@ import importlib
 import inspect
 from typing import Dict, Callable, Any, List, Optional
 
+# Per-tool registration messages are only useful when debugging discovery.
+DEBUG = bool(os.environ.get("BRONIE_DEBUG"))
+
+# Accepted parameter names per tool, recorded at discovery so dispatch doesn't
+# rebuild an inspect.Signature on every call
+TOOL_SIGS: Dict[str, frozenset] = {}
+
+# Modules in the tools directory that are helpers rather than tools
+_NON_TOOL_MODULES = frozenset({'__init__.py', 'registry.py', 'config.py', 'clipboard_image.py', 'llm.py', 'search_utils.py'})
+
 # Dynamic tool discovery
 def discover_tools() -> Dict[str, Callable]:
     """
@@ -15,8 +25,11 @@ def discover_tools() -> Dict[str, Callable]:
     tools_dir = os.path.dirname(__file__)
     tools = {}
     
-    for filename in os.listdir(tools_dir):
-        if filename.endswith('.py') and filename not in ['__init__.py', 'registry.py', 'config.py', 'clipboard_image.py', 'llm.py']:
+    with os.scandir(tools_dir) as entries:
+        filenames = [entry.name for entry in entries if entry.is_file()]
+    
+    for filename in filenames:
+        if filename.endswith('.py') and filename not in _NON_TOOL_MODULES:
             module_name = filename[:-3]  # Remove .py extension
             try:
                 # Import the module
@@ -27,7 +40,9 @@ def discover_tools() -> Dict[str, Callable]:
                     tool_function = getattr(module, module_name)
                     if callable(tool_function):
                         tools[module_name] = tool_function
-                        print(f"✅ Registered tool: {module_name}")
+                        TOOL_SIGS[module_name] = frozenset(inspect.signature(tool_function).parameters)
+                        if DEBUG:
+                            print(f"✅ Registered tool: {module_name}")
                     else:
                         print(f"⚠️  {module_name} exists but is not callable")
                 else:
@@ -62,13 +77,13 @@ def dispatch_tool(name: str, **kwargs) -> Any:
     
     # No parameter mapping needed – tool signatures are now consistent
     
-    # Get the function signature to validate parameters
+    # Look up the parameters the function accepts
     try:
-        sig = inspect.signature(tool_function)
+        params = TOOL_SIGS[name]
         # Filter kwargs to only include parameters that the function accepts
         filtered_kwargs = {}
         for param_name, param_value in kwargs.items():
-            if param_name in sig.parameters:
+            if param_name in params:
                 filtered_kwargs[param_name] = param_value
             else:
                 print(f"⚠️  Parameter '{param_name}' not accepted by {name}, ignoring")
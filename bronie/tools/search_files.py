@@ -1,9 +1,213 @@
+import io
 import os
 import re
+import stat
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import accumulate
+from operator import itemgetter
 from pathlib import Path
 from .config import IGNORED_DIRS
+from .search_utils import (
+    LINE_END_RE, LINE_ONLY_RE, SCAN_WORKERS, compile_pattern, decode_text, read_text_bytes
+)
 
-def search_files(regex_pattern, directory='.'):
+# Characters that stand for themselves in a pattern, unescaped
+_PLAIN_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-/ ,:;=\'"<>@%&!')
+
+@lru_cache(maxsize=256)
+def _literal_prefix(pattern):
+    """Return the literal text every match of *pattern* starts with ('' if there's none to rely on).
+
+    Checking for it with `in` rejects names and files that can't match
+    without running the regex at all.
+    """
+    if '|' in pattern or pattern.startswith('(?'):
+        return ''  # Alternatives or flags (e.g. (?i)) make the prefix unreliable
+    i = 1 if pattern.startswith('^') else 0
+    literal = []
+    while i < len(pattern):
+        char = pattern[i]
+        if char in _PLAIN_CHARS:
+            i += 1
+        elif char == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char = pattern[i + 1]  # Escaped punctuation, e.g. \.
+            i += 2
+        else:
+            break
+        if i < len(pattern) and pattern[i] in '*?{':
+            break  # The last character is optional or repeated
+        literal.append(char)
+    return ''.join(literal)
+
+# Resolved search directories, keyed on the working directory too so a chdir
+# is picked up
+_ABS_CACHE_SIZE = 32
+_abs_cache = {}
+
+def _abs_path(cwd, directory):
+    """Return *directory*, taken relative to *cwd*, as a normalised absolute path."""
+    key = (cwd, directory)
+    abs_path = _abs_cache.get(key)
+    if abs_path is None:
+        if len(_abs_cache) >= _ABS_CACHE_SIZE:
+            _abs_cache.clear()
+        abs_path = _abs_cache[key] = os.path.abspath(os.path.join(cwd, directory))
+    return abs_path
+
+def _walk_files(root):
+    """Yield a DirEntry for each file under *root*, pruning hidden and ignored directories."""
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    # d_type from the listing answers this without a stat
+                    if entry.is_dir(follow_symlinks=False):
+                        name = entry.name
+                        if name[:1] != '.' and name not in IGNORED_DIRS:
+                            stack.append(entry.path)
+                    elif not entry.is_dir():
+                        # Like os.walk, symlinks to directories are neither files nor followed
+                        yield entry
+        except OSError:
+            continue  # Unreadable directory; os.walk skipped these too
+
+def _matching_entries(entries, search, joined_search, literal=''):
+    """Return the entries whose names *search* matches.
+
+    The names are joined with newlines and swept by *joined_search* (the
+    pattern compiled with re.MULTILINE), so names without a match cost no
+    per-name regex call. Each hit is re-checked against its own name, and the
+    sweep resumes at the next name, so the result is exactly the per-name one.
+    """
+    names = [entry.name for entry in entries]
+    joined = '\n'.join(names)
+    if literal not in joined:
+        return []
+    if joined_search is None or joined.count('\n') != len(names) - 1:
+        # No safe whole-buffer form of the pattern, or a name with a newline in it
+        return [entry for entry, name in zip(entries, names) if search(name)]
+    # starts[i] is the offset of names[i] in joined
+    starts = [0, *accumulate(len(name) + 1 for name in names)]
+    matched = []
+    pos = 0
+    while True:
+        m = joined_search(joined, pos)
+        if m is None:
+            break
+        i = bisect_right(starts, m.start()) - 1
+        if search(names[i]):
+            matched.append(entries[i])
+        if i + 1 >= len(names):
+            break
+        pos = starts[i + 1]
+    return matched
+
+def _matched_lines(text, search, text_search, max_lines):
+    """Return line_number/line_text dicts for the first *max_lines* lines of *text* that *search* matches.
+
+    Like _matching_entries, *text_search* sweeps the whole text and only the
+    lines it lands on are split out and re-checked, so a file with a few
+    matches costs a few regex calls rather than one per line.
+    """
+    matched_lines = []
+    if text_search is None:
+        for line_num, line in enumerate(io.StringIO(text), 1):
+            if search(line):
+                matched_lines.append({
+                    'line_number': line_num,
+                    'line_text': line.rstrip()
+                })
+                if len(matched_lines) >= max_lines:
+                    break
+        return matched_lines
+    line_num = 1  # Number of the line starting at pos
+    pos = 0
+    while True:
+        m = text_search(text, pos)
+        if m is None:
+            break
+        start = text.rfind('\n', 0, m.start()) + 1
+        if start == len(text):
+            break  # Empty match after the final newline, which ends no line
+        line_num += text.count('\n', pos, start)
+        end = text.find('\n', m.start()) + 1 or len(text)
+        line = text[start:end]
+        if search(line):
+            matched_lines.append({
+                'line_number': line_num,
+                'line_text': line.rstrip()
+            })
+            if len(matched_lines) >= max_lines:
+                break
+        if end == len(text):
+            break
+        pos = end
+        line_num += 1
+    return matched_lines
+
+def _scan_file(full_path, rel_path, search, text_search, literal, raw_literal, max_file_size, max_lines):
+    """Return the search_files match dict for a file whose name matched.
+
+    *raw_literal* is *literal* encoded, or b'' when it can't be looked for in
+    the undecoded bytes.
+    """
+    match_result = {
+        'filename': rel_path,
+        'matched_lines': []
+    }
+    
+    # Search file contents if it's a text file
+    try:
+        # Binary files and oversized ones (generated bundles, logs and the
+        # like) are reported by name only
+        data = read_text_bytes(full_path, max_file_size)
+        # A substring test rules out most files without a content match
+        # before they're decoded or the regex runs at all
+        if data is not None and raw_literal in data:
+            text = decode_text(data)
+            if raw_literal or literal in text:
+                match_result['matched_lines'] = _matched_lines(text, search, text_search, max_lines)
+    except IOError:
+        # Skip files we can't read
+        pass
+    return match_result
+
+def _iter_matches(abs_path, search, joined_search, text_search, literal, max_file_size, max_lines):
+    """Yield the search_files match dict for each matching file under *abs_path*, in walk order."""
+    # Relative paths are sliced off entry.path, as in grep_search's walk
+    prefix_len = len(os.path.join(abs_path, ''))
+    entries = list(_walk_files(abs_path))
+    # Ignored directories are pruned by the walk, so only the file's own
+    # name can still be an ignored one (a .env file, say)
+    candidates = [
+        entry for entry in _matching_entries(entries, search, joined_search, literal)
+        if entry.name not in IGNORED_DIRS
+    ]
+    if not candidates:
+        return
+    # ASCII bytes always decode to themselves, so a printable ASCII literal
+    # (no line breaks to be normalised) can be found without decoding
+    raw_literal = literal.encode() if literal.isascii() and literal.isprintable() else b''
+    
+    # map() hands each result over as soon as it's ready, in order
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        yield from executor.map(
+            lambda entry: _scan_file(
+                entry.path, entry.path[prefix_len:], search, text_search,
+                literal, raw_literal, max_file_size, max_lines
+            ),
+            candidates
+        )
+
+# Larger files are reported by name only, and no file reports more matching
+# lines than this, so one huge or minified file can't stall the agent
+MAX_CONTENT_SIZE = 2_000_000
+MAX_LINES_PER_FILE = 500
+
+def search_files(regex_pattern, directory='.', max_file_size=MAX_CONTENT_SIZE, max_lines_per_file=MAX_LINES_PER_FILE):
     """
     Search for files by regex patterns in their names and optionally their contents.
     Automatically ignores common dependency directories (node_modules, .git, etc.).
@@ -12,6 +216,8 @@ def search_files(regex_pattern, directory='.'):
     Args:
         regex_pattern (str): Regex pattern to match against file names and optionally file contents
         directory (str, optional): Directory to search in (relative to project directory). Defaults to current directory.
+        max_file_size (int, optional): Files larger than this many bytes are matched by name only. Defaults to 2000000.
+        max_lines_per_file (int, optional): Most matching lines reported per file. Defaults to 500.
         
     Returns:
         dict: Search results containing:
@@ -27,62 +233,41 @@ def search_files(regex_pattern, directory='.'):
     try:
         # Compile the regex pattern
         try:
-            regex = re.compile(regex_pattern)
+            regex = compile_pattern(regex_pattern)
+            literal = _literal_prefix(regex_pattern)
+            joined_search = None
+            text_search = None
+            if not LINE_ONLY_RE.search(regex_pattern):
+                joined_search = compile_pattern(regex_pattern, re.MULTILINE).search
+                # Names have no trailing newline for LINE_END_RE's constructs to see past
+                if not LINE_END_RE.search(regex_pattern):
+                    text_search = joined_search
         except re.error as e:
             return f"Invalid regex pattern: {e}"
         
         # Ensure the path is relative to the current working directory
         # which should be the project directory set in main.py
-        directory = os.path.join(os.getcwd(), directory)
-            
-        # Get the absolute path of the directory
-        abs_path = os.path.abspath(directory)
+        cwd = os.getcwd()
+        abs_path = _abs_path(cwd, directory)
+        directory = os.path.join(cwd, directory)
         
-        if not os.path.exists(abs_path):
+        # One stat answers both "exists" and "is a directory"
+        try:
+            dir_st = os.stat(abs_path)
+        except OSError:
             return f"Directory not found: {directory}"
             
-        if not os.path.isdir(abs_path):
+        if not stat.S_ISDIR(dir_st.st_mode):
             return f"Not a directory: {directory}"
             
         # Find all matching files
-        matches = []
+        matches = list(_iter_matches(
+            abs_path, regex.search, joined_search, text_search, literal,
+            int(max_file_size), int(max_lines_per_file)
+        ))
         
-        for root, dirs, files in os.walk(abs_path):
-            # Skip ignored directories
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in IGNORED_DIRS]
-            
-            for file in files:
-                if regex.search(file):
-                    rel_path = os.path.relpath(os.path.join(root, file), abs_path)
-                    
-                    # Skip files in ignored directories
-                    if any(ignored in rel_path.split(os.sep) for ignored in IGNORED_DIRS):
-                        continue
-                        
-                    full_path = os.path.join(root, file)
-                    
-                    match_result = {
-                        'filename': rel_path,
-                        'matched_lines': []
-                    }
-                    
-                    # Search file contents if it's a text file
-                    try:
-                        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                            for line_num, line in enumerate(f, 1):
-                                if regex.search(line):
-                                    match_result['matched_lines'].append({
-                                        'line_number': line_num,
-                                        'line_text': line.rstrip()
-                                    })
-                    except IOError:
-                        # Skip files we can't read
-                        pass
-                        
-                    matches.append(match_result)
-                    
         # Sort matches by filename
-        matches.sort(key=lambda x: x['filename'])
+        matches.sort(key=itemgetter('filename'))
         
         return {
             'status': 'success',
@@ -0,0 +1,48 @@
+import os
+import re
+from functools import lru_cache
+
+# Like rg, the Python searches skip files with a NUL byte in their first
+# SNIFF_BYTES as binary.
+SNIFF_BYTES = 4096
+
+# File reads release the GIL, so the searches scan files on this many threads
+# to overlap their I/O.
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern, flags=0):
+    """Compile *pattern*, reusing the result when the agent repeats a search."""
+    return re.compile(pattern, flags)
+
+# With re.MULTILINE, ^ and $ still match at line boundaries, so a pattern can
+# be run once over a whole file (or newline-joined names) to rule out the
+# lines without a match. These patterns spot the ones where that's unsafe.
+
+# Constructs that can match a line on its own yet fail once the neighbouring
+# lines are visible. Atomic groups and possessive quantifiers can swallow the
+# newline and never give it back.
+LINE_ONLY_RE = re.compile(r'\\[AZ]|\(\?<?!|\(\?>|[?*+}]\+')
+# Lines are searched with their trailing newline, so these can also match
+# just past it, where the whole file has the next line instead of the end
+LINE_END_RE = re.compile(r'\$|\\[bB]|\(\?<=')
+
+def read_text_bytes(path, max_size=None):
+    """Return the bytes of the file at *path*, or None if it's binary or larger than *max_size*.
+
+    Raises OSError if the file can't be read.
+    """
+    with open(path, 'rb') as f:
+        if max_size is not None and os.fstat(f.fileno()).st_size > max_size:
+            return None
+        head = f.read(SNIFF_BYTES)
+        if b'\x00' in head:
+            return None
+        return head + f.read()
+
+def decode_text(data):
+    """Decode file bytes as UTF-8 with the universal newlines of text mode."""
+    text = data.decode('utf-8', errors='replace')
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
@@ -1,6 +1,5 @@
 from rich.console import Console
 from rich.panel import Panel
-from rich.markdown import Markdown
 
 def talk_to_user(message):
     """
@@ -3,7 +3,6 @@ from rich.panel import Panel
 from rich.text import Text
 from rich.table import Table
 from ..tools.exec_shell import exec_shell
-from ..tools.clipboard_image import get_clipboard_image, is_image_in_clipboard
 from ..tools.config import (
     set_agent_model, set_code_model, set_light_model,
     get_agent_model, get_code_model, get_light_model
@@ -45,13 +44,14 @@ def handle_clear_command(context):
 
 def handle_image_command(context):
     """Handle :image command - paste image from clipboard"""
-    if is_image_in_clipboard():
-        base64_data, mime_type = get_clipboard_image()
-        if base64_data:
-            context["attached_images"].append(base64_data)
-            console.print(Text("📸 Image from clipboard attached", style="green"))
-        else:
-            console.print(Text("❌ Failed to get image from clipboard", style="red"))
+    # Pillow is only needed here, so keep it off the startup path.
+    from ..tools.clipboard_image import get_clipboard_image
+    # Grab the clipboard once; checking is_image_in_clipboard() first would
+    # read and encode the whole image twice.
+    base64_data, mime_type = get_clipboard_image()
+    if base64_data:
+        context["attached_images"].append(base64_data)
+        console.print(Text("📸 Image from clipboard attached", style="green"))
     else:
         console.print(Text("❌ No image found in clipboard", style="red"))
     return True
@@ -0,0 +1,84 @@
+import random
+import re
+from difflib import unified_diff
+
+import pytest
+
+from bronie.tools.edit_file import diff
+
+_HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@$')
+
+def _lines(text):
+    lines = text.split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
+def _apply(old_lines, patch):
+    """Apply a unified diff to *old_lines*, checking each hunk's context and line counts."""
+    lines = patch.split('\n')
+    assert lines[:2] == ['--- a', '+++ b']
+    new_lines = []
+    pos = 0  # Index of the next old line to copy
+    i = 2
+    while i < len(lines):
+        header = _HUNK_HEADER_RE.match(lines[i])
+        assert header, lines[i]
+        old_start, old_count, new_start, new_count = (
+            int(group) if group is not None else 1 for group in header.groups()
+        )
+        # An empty side is numbered from the line before it
+        start = old_start - 1 if old_count else old_start
+        assert start >= pos
+        new_lines.extend(old_lines[pos:start])
+        assert (new_start - 1 if new_count else new_start) == len(new_lines)
+        pos = start
+        i += 1
+        old_seen = new_seen = 0
+        while i < len(lines) and not lines[i].startswith('@@'):
+            tag, line = lines[i][:1], lines[i][1:]
+            if tag in ' -':
+                assert old_lines[pos] == line
+                pos += 1
+                old_seen += 1
+            if tag in ' +':
+                new_lines.append(line)
+                new_seen += 1
+            i += 1
+        assert (old_seen, new_seen) == (old_count, new_count)
+    new_lines.extend(old_lines[pos:])
+    return new_lines
+
+def _random_edit(rng, lines):
+    lines = list(lines)
+    for _ in range(rng.randint(1, 4)):
+        at = rng.randint(0, len(lines))
+        removed = rng.randint(0, 3)
+        added = [rng.choice('abcde') * rng.randint(0, 2) for _ in range(rng.randint(0, 3))]
+        lines[at:at + removed] = added
+    return lines
+
+@pytest.mark.parametrize('seed', range(20))
+def test_diff_applies_to_old_text(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        # Few distinct lines, so the trimmed window often starts or ends
+        # inside a run of repeats
+        old_lines = [rng.choice('abcde') * rng.randint(0, 2) for _ in range(rng.randint(0, 30))]
+        new_lines = _random_edit(rng, old_lines)
+        a = '\n'.join(old_lines) + rng.choice(['', '\n'])
+        b = '\n'.join(new_lines) + rng.choice(['', '\n'])
+        patch = diff(a, b)
+        if _lines(a) == _lines(b):
+            assert patch == ''
+        else:
+            assert _apply(_lines(a), patch) == _lines(b), (a, b, patch)
+
+def test_diff_matches_difflib_for_a_single_change():
+    old_lines = [f'line {i}' for i in range(100)]
+    new_lines = list(old_lines)
+    new_lines[50] = 'changed'
+    a = '\n'.join(old_lines) + '\n'
+    b = '\n'.join(new_lines) + '\n'
+    expected = '\n'.join(unified_diff(old_lines, new_lines, lineterm='', fromfile='a', tofile='b'))
+    assert diff(a, b) == expected
@@ -0,0 +1,22 @@
+import os
+import time
+
+import pytest
+
+from bronie.tools.exec_shell import exec_shell
+
+@pytest.mark.skipif(os.name != 'posix', reason='needs sh and background jobs')
+def test_timeout_with_background_grandchild(tmp_path):
+    # The grandchild inherits the pipes and outlives the killed command
+    script = tmp_path / 'bg.sh'
+    script.write_text('sleep 6 &\necho started\nsleep 8\n')
+    start = time.monotonic()
+    result = exec_shell(f'sh {script}', timeout=1)
+    assert time.monotonic() - start < 4
+    assert result['stdout'] == 'started'
+    assert 'timed out after 1 seconds' in result['stderr']
+
+def test_output_is_captured():
+    result = exec_shell('echo hello')
+    assert result['stdout'] == 'hello'
+    assert result['stderr'] == ''
@@ -0,0 +1,88 @@
+import io
+import random
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from bronie.tools.search_files import _literal_prefix, _matched_lines, _matching_entries
+from bronie.tools.search_utils import LINE_END_RE, LINE_ONLY_RE
+
+# Pattern pieces chosen to hit the cases a whole-buffer sweep gets wrong:
+# newlines, anchors, word boundaries, lookarounds and possessive/atomic forms
+_ATOMS = [
+    'a', 'b', 'c', '.', '-', r'\s', r'\S', r'\n', '[^a]', '[^z]', r'[\s\S]',
+    '*', '+', '?', '^', '$', r'\b', r'\B', '(?=a)', r'(?=\s)', r'(?=\n)',
+    r'(?<=\n)', '(?<=a)', '(?<=-)', r'\w', r'\W', r'(?:a|\n)', '(?s:.)', '|',
+    '(?=)', '{2}', r'(?:\n\n)', '*+', '?+', '++', '(?>a*)', r'\A', r'\Z', '(?!a)',
+]
+
+def _random_pattern(rng):
+    while True:
+        pattern = ''.join(rng.choice(_ATOMS) for _ in range(rng.randint(1, 5)))
+        try:
+            return pattern, re.compile(pattern)
+        except re.error:
+            continue
+
+def _random_text(rng, alphabet='ab c-\n\n'):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+
+def _per_line(text, search, max_lines):
+    """The plain line-by-line scan _matched_lines must agree with."""
+    matched = []
+    for line_num, line in enumerate(io.StringIO(text), 1):
+        if search(line):
+            matched.append({'line_number': line_num, 'line_text': line.rstrip()})
+            if len(matched) >= max_lines:
+                break
+    return matched
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matched_lines_agrees_with_per_line_scan(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        pattern, regex = _random_pattern(rng)
+        if LINE_ONLY_RE.search(pattern) or LINE_END_RE.search(pattern):
+            text_search = None
+        else:
+            text_search = re.compile(pattern, re.MULTILINE).search
+        text = _random_text(rng)
+        max_lines = rng.randint(1, 5)
+        assert _matched_lines(text, regex.search, text_search, max_lines) == \
+            _per_line(text, regex.search, max_lines), (pattern, text)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matching_entries_agrees_with_per_name_search(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        pattern, regex = _random_pattern(rng)
+        if LINE_ONLY_RE.search(pattern):
+            joined_search = None
+        else:
+            joined_search = re.compile(pattern, re.MULTILINE).search
+        entries = [
+            SimpleNamespace(name=_random_text(rng, 'ab c-.'))
+            for _ in range(rng.randint(0, 8))
+        ]
+        literal = _literal_prefix(pattern)
+        expected = [entry for entry in entries if regex.search(entry.name)]
+        assert _matching_entries(entries, regex.search, joined_search, literal) == expected, \
+            (pattern, [entry.name for entry in entries])
+
+@pytest.mark.parametrize('seed', range(20))
+def test_literal_prefix_is_in_every_match(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        pattern, regex = _random_pattern(rng)
+        text = _random_text(rng)
+        if regex.search(text):
+            assert _literal_prefix(pattern) in text, (pattern, text)
+
+def test_literal_prefix():
+    assert _literal_prefix('foo_bar') == 'foo_bar'
+    assert _literal_prefix(r'^setup\.py$') == 'setup.py'
+    assert _literal_prefix('colou?r') == 'colo'
+    assert _literal_prefix('ab*c') == 'a'
+    assert _literal_prefix('foo|bar') == ''
+    assert _literal_prefix('(?i)readme') == ''